@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Distill a sentiment teacher model into a 6-layer student.
+
+The student copies the teacher's embeddings, classifier head and every other
+encoder layer (DistilBERT-style initialization), so it keeps the teacher's
+tokenizer and label set. It is then trained on unlabeled text against the
+teacher's soft labels:
+
+    loss = alpha * KL(student / T || teacher / T) * T^2 + beta * CE(student, teacher_argmax)
+
+Usage:
+    python scripts/distill.py \
+        --teacher NYTK/sentiment-hts5-xlm-roberta-hungarian \
+        --corpus data/hun_news.txt \
+        --output models/hun-distilled
+
+    SENTIMENT_HUN_MODEL=models/hun-distilled python src/server/main.py
+
+The corpus is a plain text file with one text per line.
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import random
+
+import torch
+import torch.nn.functional as F
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+MAX_SEQ_LEN = 128
+
+
+def build_student(teacher, num_layers: int):
+    """Copy the teacher and keep `num_layers` evenly spaced encoder layers."""
+    student = copy.deepcopy(teacher)
+    encoder = student.base_model.encoder
+    teacher_layers = len(encoder.layer)
+    step = max(teacher_layers // num_layers, 1)
+    encoder.layer = torch.nn.ModuleList(encoder.layer[i] for i in range(0, teacher_layers, step)[:num_layers])
+    student.config.num_hidden_layers = len(encoder.layer)
+    return student
+
+
+def read_corpus(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def distill(args: argparse.Namespace) -> None:
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    tokenizer = AutoTokenizer.from_pretrained(args.teacher, use_fast=True)
+    teacher = AutoModelForSequenceClassification.from_pretrained(args.teacher).to(device).eval()
+    student = build_student(teacher, args.layers).to(device).train()
+
+    texts = read_corpus(args.corpus)
+    optimizer = torch.optim.AdamW(student.parameters(), lr=args.lr)
+    temperature = args.temperature
+
+    for epoch in range(args.epochs):
+        random.shuffle(texts)
+        total = 0.0
+        for step, start in enumerate(range(0, len(texts), args.batch_size), start=1):
+            inputs = tokenizer(
+                texts[start:start + args.batch_size],
+                return_tensors="pt",
+                truncation=True,
+                max_length=MAX_SEQ_LEN,
+                padding="longest",
+            ).to(device)
+
+            with torch.no_grad():
+                teacher_logits = teacher(**inputs).logits
+            student_logits = student(**inputs).logits
+
+            soft_loss = F.kl_div(
+                F.log_softmax(student_logits / temperature, dim=-1),
+                F.softmax(teacher_logits / temperature, dim=-1),
+                reduction="batchmean",
+            ) * temperature ** 2
+            hard_loss = F.cross_entropy(student_logits, teacher_logits.argmax(dim=-1))
+            loss = args.alpha * soft_loss + args.beta * hard_loss
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+
+            total += loss.item()
+            if step % 100 == 0:
+                print(f"epoch {epoch + 1} step {step}: loss {total / step:.4f}")
+
+    student.save_pretrained(args.output)
+    tokenizer.save_pretrained(args.output)
+    print(f"Saved {student.config.num_hidden_layers}-layer student to {args.output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teacher", required=True, help="HF model id or path of the teacher")
+    parser.add_argument("--corpus", required=True, help="text file, one unlabeled text per line")
+    parser.add_argument("--output", required=True, help="directory to save the student to")
+    parser.add_argument("--layers", type=int, default=6)
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--lr", type=float, default=5e-5)
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--alpha", type=float, default=0.5, help="weight of the soft (KL) loss")
+    parser.add_argument("--beta", type=float, default=0.5, help="weight of the hard (CE) loss")
+    distill(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-from pydoc import text
 import grpc
 
 
@@ -31,6 +30,18 @@ texts = [
 
 
 def run():
+    """Send every text in a single BatchAnalyze RPC."""
+    print("test starts")
+    with grpc.insecure_channel("127.0.0.1:50051") as channel:
+        stub = pb_grpc.SentimentServiceStub(channel)
+        items = [pb.AnalyzeRequest(text=text, language=lang) for text, lang in texts]
+        response = stub.BatchAnalyze(pb.BatchAnalyzeRequest(items=items))
+        for result in response.results:
+            print(result)
+
+
+def run_unary():
+    """One Analyze RPC per text; kept as a correctness reference for run()."""
     print("test starts")
     with grpc.insecure_channel("127.0.0.1:50051") as channel:
         stub = pb_grpc.SentimentServiceStub(channel)
@@ -42,4 +53,3 @@ def run():
 
 if __name__ == "__main__":
     run()
-
@@ -1,85 +1,336 @@
 # libs/sentiment_analyzers/analyzers/base_analyzer.py
+import hashlib
+import logging
+import os
 import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import onnxruntime as ort
 import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
-from libs.sentiment_analyzers.models.sentiments import Sentiments  # type: ignore
-from libs.sentiment_analyzers.models.sentiments import LABEL_MAPPING_ROBERTA  # type: ignore
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from optimum.onnxruntime import ORTModelForSequenceClassification, ORTOptimizer
+from optimum.onnxruntime.configuration import OptimizationConfig
+from scipy.special import softmax
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+from libs.sentiment_analyzers.models.sentiments import SENTIMENT_FIELDS, Sentiments  # type: ignore
+
+# Run on GPU in FP16 when CUDA is available (SENTIMENT_FORCE_CPU=1 keeps everything on CPU)
+USE_CUDA = torch.cuda.is_available() and os.getenv("SENTIMENT_FORCE_CPU") != "1"
+DEVICE = "cuda" if USE_CUDA else "cpu"
+TORCH_DTYPE = torch.float16 if USE_CUDA else torch.float32
+
+# Inference backend: "onnx" (ONNX Runtime, CPU default) or "torch" (PyTorch, GPU default)
+BACKEND = os.getenv("SENTIMENT_BACKEND", "torch" if USE_CUDA else "onnx").lower()
+
+# torch backend only: compile the model with Inductor (set to "0" to run eager)
+COMPILE = os.getenv("SENTIMENT_COMPILE", "1") == "1"
+
+# Exported + optimized ONNX graphs are cached here, one folder per model (see _onnx_cache_dir)
+ONNX_CACHE_DIR = Path(os.getenv("SENTIMENT_ONNX_CACHE", Path.home() / ".cache" / "sentiment_onnx"))
+ONNX_FILE_NAME = "model_optimized.onnx"
+QUANTIZED_FILE_NAME = "model_quantized.onnx"
+
+# Dynamic INT8 weight quantization of the ONNX graph (set to "0" to keep FP32 weights)
+INT8 = os.getenv("SENTIMENT_INT8", "1") == "1"
+
+# ONNX Runtime intra-op threads per session (0 lets ONNX Runtime pick the core count)
+INTRA_OP_THREADS = int(os.getenv("SENTIMENT_INTRA_OP_THREADS", "0"))
+
+# Batches are split by token length into these buckets. ONNX Runtime pads each bucket only to
+# its own longest text; the torch backend pads to the bucket boundary (see _encode_batch)
+SEQ_BUCKETS = (32, 64, 128)
+MAX_SEQ_LEN = SEQ_BUCKETS[-1]
+
+# Upper bound on texts per forward pass, so one large batch can never exhaust memory
+MAX_BATCH = int(os.getenv("MAX_BATCH", "32"))
+
+log = logging.getLogger(__name__)
+
+
+def _onnx_cache_dir(model_name: str) -> Path:
+    """
+    Cache folder for the ONNX export of `model_name`.
+
+    Hub ids map to ONNX_CACHE_DIR/<org>/<name>. Local model directories (e.g. a
+    distilled student) map to ONNX_CACHE_DIR/local/<dirname>-<fingerprint>, where
+    the fingerprint covers the resolved path plus size and mtime of every file,
+    so retraining in place triggers a fresh export and absolute paths never
+    escape the cache root.
+    """
+    local_dir = Path(model_name)
+    if not local_dir.is_dir():
+        return ONNX_CACHE_DIR / model_name
+
+    local_dir = local_dir.resolve()
+    signature = sorted(
+        (f.name, f.stat().st_size, f.stat().st_mtime_ns) for f in local_dir.iterdir() if f.is_file()
+    )
+    fingerprint = hashlib.sha256(repr((str(local_dir), signature)).encode()).hexdigest()[:16]
+    return ONNX_CACHE_DIR / "local" / f"{local_dir.name}-{fingerprint}"
+
+
+def _load_onnx_model(model_name: str) -> ORTModelForSequenceClassification:
+    """
+    Load `model_name` as an ONNX Runtime model with graph-level fusions applied.
+
+    The first call exports the checkpoint to ONNX, runs ORTOptimizer on it and
+    stores the result under _onnx_cache_dir(model_name); later cold starts load
+    the cached graph directly. With SENTIMENT_INT8 enabled the optimized graph
+    is additionally quantized to INT8 weights, including the fused Attention
+    nodes (QAttention) so the Q/K/V projections are quantized too.
+    """
+    export_dir = _onnx_cache_dir(model_name)
+    if not (export_dir / ONNX_FILE_NAME).exists():
+        model = ORTModelForSequenceClassification.from_pretrained(
+            model_name, export=True, provider="CPUExecutionProvider"
+        )
+        optimizer = ORTOptimizer.from_pretrained(model)
+        optimizer.optimize(
+            save_dir=export_dir,
+            optimization_config=OptimizationConfig(
+                optimization_level=99, optimize_for_gpu=False, fp16=False
+            ),
+        )
+
+    file_name = ONNX_FILE_NAME
+    if INT8:
+        file_name = QUANTIZED_FILE_NAME
+        if not (export_dir / QUANTIZED_FILE_NAME).exists():
+            quantize_dynamic(
+                export_dir / ONNX_FILE_NAME,
+                export_dir / QUANTIZED_FILE_NAME,
+                weight_type=QuantType.QInt8,
+                op_types_to_quantize=["MatMul", "Gemm", "Attention"],
+            )
+
+    session_options = ort.SessionOptions()
+    session_options.intra_op_num_threads = INTRA_OP_THREADS
+
+    return ORTModelForSequenceClassification.from_pretrained(
+        export_dir,
+        file_name=file_name,
+        provider="CPUExecutionProvider",
+        session_options=session_options,
+    )
+
+
+def _load_torch_model(model_name: str):
+    """Load `model_name` as an eval-mode PyTorch model on DEVICE, compiled if enabled."""
+    model = AutoModelForSequenceClassification.from_pretrained(model_name, torch_dtype=TORCH_DTYPE)
+    model.to(DEVICE)
+    model.eval()
+    if COMPILE:
+        # Inputs are padded to a SEQ_BUCKETS boundary and capped at MAX_BATCH texts, so
+        # reduce-overhead records a bounded set of CUDA graphs (one per batch size and bucket)
+        model = torch.compile(model, mode="reduce-overhead", dynamic=True, fullgraph=False)
+
+    torch.set_num_threads(max(torch.get_num_threads(), 1))
+    return model
+
+
+def _model_key(model_name: str) -> tuple:
+    """Cache key identifying one loaded copy of a checkpoint."""
+    if BACKEND == "onnx":
+        return (model_name, BACKEND, "cpu", "int8" if INT8 else "float32")
+    return (model_name, BACKEND, DEVICE, str(TORCH_DTYPE))
+
 
 class SentimentAnalyzerSingleton:
     _instances = {}
-    _lock = threading.Lock()
+
+    # (tokenizer, ort_model, model) per _model_key, shared by subclasses using the same checkpoint
+    _models: dict[tuple, tuple] = {}
+    _model_locks: dict[tuple, threading.Lock] = {}
+    _model_locks_guard = threading.Lock()
+
+    truncation: bool = True
+    label_mapping: dict = {}  # raw model label -> Sentiments field name
+    top_k: int | None = None  # keep only the k most likely labels, the rest score 0
+    ort_model = None
+    model = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # One lock per analyzer class, so one language's model load never blocks another's
+        cls._lock = threading.Lock()
 
     def __new__(cls, *args, **kwargs):
+        # Fast path: already built, no lock needed
+        inst = cls._instances.get(cls)
+        if inst is not None:
+            return inst
+
         # Ensure subclasses define model_name
         if not getattr(cls, "model_name", None):
             raise ValueError(f"{cls.__name__} must define a class attribute 'model_name'")
 
         with cls._lock:
             if cls not in cls._instances:
-                tokenizer = AutoTokenizer.from_pretrained(cls.model_name)
-                model = AutoModelForSequenceClassification.from_pretrained(cls.model_name)
-
-                torch.set_num_threads(max(torch.get_num_threads(), 1))
-                device = -1  # CPU only
-
-                pipe = pipeline(
-                    task="text-classification",
-                    model=model,
-                    tokenizer=tokenizer,
-                    device=device,
-                    top_k=getattr(cls, "top_k", None),
-                    truncation=getattr(cls, "truncation", True),
-                    return_all_scores=True,
-                )
-
-                inst = super().__new__(cls)
-                inst.pipeline = pipe
-
-                # Optional warm-up
-                try:
-                    inst.pipeline("ok")
-                except Exception:
-                    pass
+                key = _model_key(cls.model_name)
+
+                # Per-checkpoint lock: subclasses sharing a model load (and warm up) one copy
+                with SentimentAnalyzerSingleton._model_locks_guard:
+                    model_lock = SentimentAnalyzerSingleton._model_locks.setdefault(key, threading.Lock())
+
+                with model_lock:
+                    loaded = SentimentAnalyzerSingleton._models.get(key)
+                    built = loaded is None
+                    if built:
+                        tokenizer = AutoTokenizer.from_pretrained(cls.model_name, use_fast=True)
+                        if BACKEND == "onnx":
+                            loaded = (tokenizer, _load_onnx_model(cls.model_name), None)
+                        else:
+                            loaded = (tokenizer, None, _load_torch_model(cls.model_name))
+                        SentimentAnalyzerSingleton._models[key] = loaded
+
+                    inst = super().__new__(cls)
+                    inst.tokenizer, inst.ort_model, inst.model = loaded
+                    config = (inst.ort_model if inst.ort_model is not None else inst.model).config
+
+                    inst.id2label = {int(idx): label for idx, label in config.id2label.items()}
+
+                    # Model label index -> Sentiments field index, resolved once per model
+                    inst._label_perm = np.array(
+                        [
+                            SENTIMENT_FIELDS.index(cls.label_mapping.get(inst.id2label[idx], inst.id2label[idx]))
+                            for idx in range(len(inst.id2label))
+                        ],
+                        dtype=np.intp,
+                    )
+
+                    # Warm up the length buckets at several batch sizes so compiled kernels, CUDA
+                    # graphs and ORT buffers exist before the first request; a failing
+                    # torch.compile falls back to eager.
+                    # Only the call that loaded the checkpoint warms it up.
+                    if built:
+                        try:
+                            inst._warm_up()
+                        except Exception:
+                            log.exception("Warm-up failed for %s", cls.model_name)
+                            if inst.model is not None and hasattr(inst.model, "_orig_mod"):
+                                inst.model = inst.model._orig_mod
+                                SentimentAnalyzerSingleton._models[key] = (inst.tokenizer, None, inst.model)
 
                 cls._instances[cls] = inst
 
             return cls._instances[cls]
 
-    def analyze(self, text: str):
+    def analyze(self, text: str) -> np.ndarray:
         if not text:
             raise ValueError("Missing text to analyze")
-        return self.pipeline(text)
+        return self._predict([text])[0]
+
+    def _predict(self, texts: List[str]) -> np.ndarray:
+        """
+        Run the model on a list of texts, one forward pass per length bucket
+        and per MAX_BATCH texts within a bucket.
+
+        Returns:
+            Array of shape (len(texts), num_labels) with class probabilities
+            in the model's label-id order, aligned with `texts`.
+        """
+        # ONNX Runtime takes any shape, so a single text needs no bucketing there
+        if len(texts) == 1 and self.ort_model is not None:
+            return self._forward(texts)
+
+        lengths = self.tokenizer(
+            texts, truncation=True, max_length=MAX_SEQ_LEN, return_length=True
+        )["length"]
+        buckets: dict[int, list[int]] = {}
+        for idx, length in enumerate(lengths):
+            buckets.setdefault(bisect_left(SEQ_BUCKETS, length), []).append(idx)
+
+        probs = np.empty((len(texts), len(self.id2label)), dtype=np.float32)
+        for bucket, indices in buckets.items():
+            for start in range(0, len(indices), MAX_BATCH):
+                chunk = indices[start:start + MAX_BATCH]
+                probs[chunk] = self._forward([texts[idx] for idx in chunk], SEQ_BUCKETS[bucket])
+        return probs
+
+    def _encode_batch(self, texts: List[str], return_tensors: str = "np", max_length: int = MAX_SEQ_LEN):
+        """
+        Tokenize `texts` in one fast-tokenizer call. ONNX Runtime pads to the longest
+        text; the torch backend pads to `max_length` so the compiled model only ever
+        sees SEQ_BUCKETS sequence lengths.
+        """
+        return self.tokenizer(
+            texts,
+            return_tensors=return_tensors,
+            truncation=self.truncation,
+            max_length=max_length,
+            padding="longest" if self.ort_model is not None else "max_length",
+        )
+
+    def _warm_up(self) -> None:
+        """
+        Run forward passes at exactly each SEQ_BUCKETS length (special tokens
+        included), built from token ids so every bucket is hit, at batch sizes
+        1, 2 and MAX_BATCH: a single text, the first dynamic batch shape, and a
+        full micro-batch.
+        """
+        filler_id = self.tokenizer.convert_tokens_to_ids(self.tokenizer.tokenize("word")[0])
+        num_special = self.tokenizer.num_special_tokens_to_add()
+        for seq_len in SEQ_BUCKETS:
+            example = self.tokenizer.prepare_for_model([filler_id] * (seq_len - num_special))
+            for batch_size in sorted({1, 2, MAX_BATCH}):
+                inputs = self.tokenizer.pad([example] * batch_size, return_tensors=self._tensor_type)
+                self._run_model(inputs)
+
+    @property
+    def _tensor_type(self) -> str:
+        return "np" if self.ort_model is not None else "pt"
+
+    def _forward(self, texts: List[str], max_length: int = MAX_SEQ_LEN) -> np.ndarray:
+        """Single forward pass over `texts`, all of which fit in `max_length` tokens."""
+        return self._run_model(self._encode_batch(texts, return_tensors=self._tensor_type, max_length=max_length))
+
+    def _run_model(self, inputs) -> np.ndarray:
+        """Run tokenized `inputs` through the model and return class probabilities."""
+        if self.ort_model is not None:
+            logits = self.ort_model(**inputs).logits
+        else:
+            inputs = inputs.to(DEVICE)
+            with torch.inference_mode():
+                logits = self.model(**inputs).logits.float().cpu().numpy()
+
+        # Probabilities stay in label-id order; no per-example sort
+        return softmax(logits, axis=-1)
 
-    def _map_predictions_to_sentiments(self, predictions: list, label_mapping: dict) -> Sentiments:
+    def _map_predictions_to_sentiments(self, predictions: np.ndarray) -> Sentiments:
         """
         Common logic to convert model predictions to Sentiments dataclass.
-        
+
         Args:
-            predictions: List of dicts with 'label' and 'score' keys
-            label_mapping: Dict mapping raw labels to sentiment keys
-            
+            predictions: Class probabilities in the model's label-id order
+
         Returns:
             Sentiments object with mapped scores
         """
-        scores = {}
-        for item in predictions:
-            raw_label = item["label"]
-            label = label_mapping.get(raw_label, raw_label)
-            scores[label] = round(float(item["score"]), 4)
-        return Sentiments(**scores)
-
-    def _map_batch_predictions_to_sentiments(self, batch_predictions: list, label_mapping: dict) -> list:
+        return self._map_batch_predictions_to_sentiments(predictions[np.newaxis])[0]
+
+    def _map_batch_predictions_to_sentiments(self, batch_predictions: np.ndarray) -> list:
         """
         Common logic to convert batch predictions to Sentiments objects.
-        
+
+        Probabilities are scattered into Sentiments field order through the
+        precomputed label permutation; fields the model has no label for, and
+        labels outside the top_k most likely, stay 0.
+        Scores keep full precision; Sentiments derives the compound score.
+
         Args:
-            batch_predictions: List of prediction lists
-            label_mapping: Dict mapping raw labels to sentiment keys
-            
+            batch_predictions: Array of shape (N, num_labels) with class probabilities
+
         Returns:
             List of Sentiments objects
         """
-        results = []
-        for predictions in batch_predictions:
-            results.append(self._map_predictions_to_sentiments(predictions, label_mapping))
-        return results
+        if self.top_k is not None and self.top_k < batch_predictions.shape[1]:
+            batch_predictions = batch_predictions.copy()
+            dropped = np.argpartition(batch_predictions, -self.top_k, axis=1)[:, :-self.top_k]
+            np.put_along_axis(batch_predictions, dropped, 0.0, axis=1)
+
+        scores = np.zeros((len(batch_predictions), len(SENTIMENT_FIELDS)), dtype=np.float64)
+        scores[:, self._label_perm] = batch_predictions
+        return [Sentiments(*row) for row in scores.tolist()]
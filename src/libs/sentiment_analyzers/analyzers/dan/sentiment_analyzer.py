@@ -30,12 +30,13 @@ class DanishSentimentAnalyzer(SentimentAnalyzerSingleton):
     # Let the base singleton handle instantiation/caching
     model_name: str = "larskjeldgaard/senda"
     truncation: bool = True
-    top_k: int = 3  # or None / omit if your base supports it
+    top_k: int = 3
+    label_mapping: dict = LABEL_MAPPING_DANISH
 
     def analyze_text(self, text: str) -> Sentiments:
-        preds = self.pipeline(text)[0]  # list[{"label":..., "score":...}, ...]
-        return self._map_predictions_to_sentiments(preds, LABEL_MAPPING_DANISH)
+        preds = self._predict([text])[0]  # probabilities in label-id order
+        return self._map_predictions_to_sentiments(preds)
 
     def analyze_batch(self, texts: List[str]) -> List[Sentiments]:
-        preds_batch = self.pipeline(texts)
-        return self._map_batch_predictions_to_sentiments(preds_batch, LABEL_MAPPING_DANISH)
+        preds_batch = self._predict(texts)
+        return self._map_batch_predictions_to_sentiments(preds_batch)
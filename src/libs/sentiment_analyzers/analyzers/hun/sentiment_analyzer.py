@@ -1,5 +1,6 @@
 # libs/sentiment_analyzers/analyzers/hun/sentiment_analyzer.py
 
+import os
 from typing import List
 
 from libs.sentiment_analyzers.analyzers.base_analyzer import SentimentAnalyzerSingleton
@@ -12,24 +13,26 @@ class HungarianSentimentAnalyzer(SentimentAnalyzerSingleton):
     """
     Hungarian sentiment analyzer based on NYTK's RoBERTa model.
     Inherits singleton behavior from SentimentAnalyzerSingleton, so the
-    HuggingFace pipeline is initialized once and reused.
+    model is initialized once and reused.
     """
 
     # Model config (must be class attributes for base class to pick up)
-    model_name: str = "NYTK/sentiment-hts5-xlm-roberta-hungarian"
+    # SENTIMENT_HUN_MODEL can point to a distilled student, e.g. "models/hun-distilled"
+    model_name: str = os.getenv("SENTIMENT_HUN_MODEL", "NYTK/sentiment-hts5-xlm-roberta-hungarian")
     truncation: bool = True
     top_k: int = 3
+    label_mapping: dict = LABEL_MAPPING_ROBERTA
 
     def analyze_text(self, text: str) -> Sentiments:
         """
         Analyze a single Hungarian text and return sentiment scores.
         """
-        predictions = self.pipeline(text)[0]  # pipeline returns [[{label, score}, ...]]
-        return self._map_predictions_to_sentiments(predictions, LABEL_MAPPING_ROBERTA)
+        predictions = self._predict([text])[0]  # probabilities in label-id order
+        return self._map_predictions_to_sentiments(predictions)
 
     def analyze_batch(self, texts: List[str]) -> List[Sentiments]:
         """
         Analyze a batch of texts in one forward pass for efficiency.
         """
-        predictions_batch = self.pipeline(texts)
-        return self._map_batch_predictions_to_sentiments(predictions_batch, LABEL_MAPPING_ROBERTA)
+        predictions_batch = self._predict(texts)
+        return self._map_batch_predictions_to_sentiments(predictions_batch)
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
-import threading
-from typing import Dict
+import functools
 
 from libs.sentiment_analyzers.analyzers.dan.sentiment_analyzer import DanishSentimentAnalyzer
 from libs.sentiment_analyzers.analyzers.eng.sentiment_analyzer import EnglishSentimentAnalyzer
@@ -17,15 +16,23 @@ class SentimentAnalyzerFactory:
         result = analyzer.analyze_text("...")
     """
 
-    _lock = threading.Lock()
-    _analyzers: Dict[str, object] = {}
-
     _constructors = {
         "hun": HungarianSentimentAnalyzer,
         "dan": DanishSentimentAnalyzer,
         "eng": EnglishSentimentAnalyzer,
     }
 
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _cached_build(language: str):
+        """Create the analyzer once per language; later calls are a C-level cache hit."""
+        return SentimentAnalyzerFactory._constructors[language]()  # __new__ loads the model once
+
+    @staticmethod
+    def languages() -> tuple[str, ...]:
+        """Supported language codes."""
+        return tuple(SentimentAnalyzerFactory._constructors)
+
     @staticmethod
     def get_analyzer(language: str):
         """
@@ -34,17 +41,4 @@ class SentimentAnalyzerFactory:
         """
         if language not in SentimentAnalyzerFactory._constructors:
             raise ValueError(f"Unsupported language: {language}")
-
-        # Fast path: already cached
-        analyzer = SentimentAnalyzerFactory._analyzers.get(language)
-        if analyzer is not None:
-            return analyzer
-
-        # Slow path: create once
-        with SentimentAnalyzerFactory._lock:
-            analyzer = SentimentAnalyzerFactory._analyzers.get(language)
-            if analyzer is None:
-                ctor = SentimentAnalyzerFactory._constructors[language]
-                analyzer = ctor()  # __init__/__new__ should load pipeline once
-                SentimentAnalyzerFactory._analyzers[language] = analyzer
-        return analyzer
+        return SentimentAnalyzerFactory._cached_build(language)
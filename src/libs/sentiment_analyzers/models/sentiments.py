@@ -1,5 +1,5 @@
 import math
-from dataclasses import asdict, dataclass, field
+from dataclasses import asdict, dataclass, field, fields
 
 # Hungarian sentiment results mapping
 LABEL_MAPPING_ROBERTA = {
@@ -52,7 +52,7 @@ class Sentiments:
             float: The calculated compound sentiment score.
         """
         score = self.positive - self.negative
-        return round(math.tanh(score), 4)
+        return math.tanh(score)
 
     def __post_init__(self):
         """
@@ -60,16 +60,12 @@ class Sentiments:
 
         If the compound score is left as its default value (0.0), it is
         recalculated based on the `positive` and `negative` scores.
+        Scores are kept at full precision; the gRPC server rounds them when
+        building responses.
         """
-
-        # Round all float fields to 4 decimals
-        self.negative = round(self.negative, 4)
-        self.very_negative = round(self.very_negative, 4)
-        self.neutral = round(self.neutral, 4)
-        self.positive = round(self.positive, 4)
-        self.very_positive = round(self.very_positive, 4)
-
         if self.compound == 0.0:
             self.compound = self.calculate_compound()
-        else:
-            self.compound = round(self.compound, 4)
+
+
+# Sentiments field names in declaration (= positional argument) order
+SENTIMENT_FIELDS = tuple(f.name for f in fields(Sentiments))
@@ -0,0 +1,98 @@
+# server/batching.py
+"""
+Per-language micro-batching for Analyze and BatchAnalyze.
+
+Texts submitted for the same language, from any RPC, are coalesced into one
+analyzer.analyze_batch() call, so a mixed stream of unary requests still
+forms dense per-language batches instead of one forward pass per text.
+
+Environment variables:
+- MAX_BATCH         (default: "32")  max texts per forward pass
+- BATCH_WINDOW_MS   (default: "5")   how long to wait for a batch to fill up
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import Executor
+from typing import Dict, List, Tuple
+
+from libs.sentiment_analyzers.analyzers.base_analyzer import MAX_BATCH  # type: ignore
+from libs.sentiment_analyzers.factory.sentiment_factory import SentimentAnalyzerFactory  # type: ignore
+from libs.sentiment_analyzers.models.sentiments import Sentiments  # type: ignore
+
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "5"))
+
+
+class LangBatcher:
+    """
+    Queue of pending texts for one language, drained by a background asyncio task.
+    Must be created inside the running event loop.
+
+    Usage:
+        batcher = get_batcher("hun", executor)
+        result = await batcher.submit("...")
+    """
+
+    def __init__(self, analyzer, executor: Executor, max_batch: int = MAX_BATCH, window_ms: float = BATCH_WINDOW_MS):
+        self.analyzer = analyzer
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self._executor = executor
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[Tuple[str, asyncio.Future]] = asyncio.Queue()
+        self._task = self._loop.create_task(self._run())
+
+    async def submit(self, text: str) -> Sentiments:
+        """Analyze a single text as part of the next batch."""
+        future = self._loop.create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        """Wait for the first item, then gather more until the window closes or the batch is full."""
+        items = [await self._queue.get()]
+        deadline = self._loop.time() + self.window
+        while len(items) < self.max_batch:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except TimeoutError:
+                break
+        return items
+
+    async def _run(self) -> None:
+        while True:
+            # Callers that timed out have cancelled (= done) futures; skip them
+            items = [(text, future) for text, future in await self._collect() if not future.done()]
+            if not items:
+                continue
+
+            try:
+                results = await self._loop.run_in_executor(
+                    self._executor, self.analyzer.analyze_batch, [text for text, _ in items]
+                )
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+_batchers: Dict[str, LangBatcher] = {}
+
+
+def get_batcher(language: str, executor: Executor) -> LangBatcher:
+    """Retrieve (and lazily create) the batcher for a language. Call from the event loop only."""
+    batcher = _batchers.get(language)
+    if batcher is None:
+        batcher = LangBatcher(SentimentAnalyzerFactory.get_analyzer(language), executor)
+        _batchers[language] = batcher
+    return batcher
@@ -3,7 +3,7 @@
 gRPC Sentiment Service (Python)
 ==============================
 
-This service exposes two unary RPCs:
+This asyncio (grpc.aio) service exposes two unary RPCs:
 
 - Analyze(AnalyzeRequest) -> AnalyzeResponse
 - BatchAnalyze(BatchAnalyzeRequest) -> BatchAnalyzeResponse
@@ -24,7 +24,9 @@ Expected analyzer output (per text):
 Environment variables:
 - GRPC_HOST     (default: "127.0.0.1")
 - GRPC_PORT     (default: "50051")
-- MAX_WORKERS   (default: "4")
+- MODEL_THREADS (default: "1")   executor threads for blocking analyzer calls
+- MAX_BATCH     (default: "32")  per-language micro-batch size
+- BATCH_WINDOW_MS (default: "5") per-language micro-batch window
 
 Run:
     python server_py/server.py
@@ -32,25 +34,35 @@ Run:
 
 from __future__ import annotations
 
+import asyncio
 import os
-import time
+import signal
 import logging
-from concurrent import futures
-from dataclasses import asdict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
 
 import grpc
+import numpy as np
+import torch
+from google.protobuf.internal import api_implementation
 
 import pb.sentiment_pb2_grpc as pb_grpc
 from pb import sentiment_pb2 as pb
 
 # Sentiment Analyzer Factory & Sentiments dataclass
 from libs.sentiment_analyzers.factory.sentiment_factory import SentimentAnalyzerFactory  # type: ignore
-from libs.sentiment_analyzers.models.sentiments import Sentiments  # type: ignore
+from libs.sentiment_analyzers.analyzers.base_analyzer import SentimentAnalyzerSingleton  # type: ignore
+from libs.sentiment_analyzers.models.sentiments import SENTIMENT_FIELDS, Sentiments  # type: ignore
+from server.batching import get_batcher
 
 # ---------------------------------------------------------------------------
 
 SERVER_VERSION = "poc-0.3.0"
 
+# Seconds in-flight RPCs get to finish after SIGINT/SIGTERM
+SHUTDOWN_GRACE = 5
+
 # Basic logging setup (adjust level/format as you wish)
 logging.basicConfig(
     level=logging.INFO,
@@ -58,6 +70,14 @@ logging.basicConfig(
 )
 log = logging.getLogger("sentiment-grpc-server")
 
+# Sentiments fields are fixed, so resolve the getter once at import
+SCORE_FIELDS = tuple(name for name in SENTIMENT_FIELDS if name != "compound")
+_SCORE_POSITIONS = tuple(SENTIMENT_FIELDS.index(name) for name in SCORE_FIELDS)
+_get_all = attrgetter(*SENTIMENT_FIELDS)
+
+# Response prototype with every sentiments key preinserted; each response starts as a copy
+_RESPONSE_TEMPLATE = pb.AnalyzeResponse(sentiments=dict.fromkeys(SENTIMENT_FIELDS, 0.0))
+
 
 
 def map_result_to_response(text: str, result_obj: Sentiments) -> pb.AnalyzeResponse:
@@ -68,7 +88,7 @@ def map_result_to_response(text: str, result_obj: Sentiments) -> pb.AnalyzeRespo
       - sentiment_value: dominant score
       - sentiments: all scores as a map
     """
-    if not result_obj:
+    if result_obj is None:
         return pb.AnalyzeResponse(
             title=text,
             sentiment_key="unknown",
@@ -76,103 +96,126 @@ def map_result_to_response(text: str, result_obj: Sentiments) -> pb.AnalyzeRespo
             sentiments={}
         )
 
-    # Determine dominant label by checking dataclass fields directly (ignore compound)
-    sentiment_scores = {
-        "negative": result_obj.negative,
-        "very_negative": result_obj.very_negative,
-        "neutral": result_obj.neutral,
-        "positive": result_obj.positive,
-        "very_positive": result_obj.very_positive,
-    }
-    
-    if sentiment_scores:
-        sentiment_key, sentiment_value = max(sentiment_scores.items(), key=lambda kv: kv[1])
-    else:
-        sentiment_key, sentiment_value = "compound", result_obj.compound
-
-    # Convert to dict once for protobuf response
-    result_dict = asdict(result_obj)
-
-    # Build response
-    return pb.AnalyzeResponse(
-        title=text,
-        sentiment_key=sentiment_key,
-        sentiment_value=float(sentiment_value),
-        sentiments=result_dict
-    )
+    # Round every score to 4 decimals in one vectorized call; analyzers keep full precision
+    values = np.round(_get_all(result_obj), 4).tolist()
+
+    # Dominant label = first maximum over the non-compound fields
+    idx = max(_SCORE_POSITIONS, key=values.__getitem__)
+
+    # Build response from the template (C-level copy), then overwrite values in place
+    response = pb.AnalyzeResponse()
+    response.CopyFrom(_RESPONSE_TEMPLATE)
+    response.title = text
+    response.sentiment_key = SENTIMENT_FIELDS[idx]
+    response.sentiment_value = values[idx]
+    for key, value in zip(SENTIMENT_FIELDS, values):
+        response.sentiments[key] = value
+    return response
+
+
+def _timeout(context: grpc.aio.ServicerContext) -> float | None:
+    """
+    Seconds left until the RPC deadline, or None when the client set none
+    (time_remaining() then reports ~9.2e18, which timeouts cannot take).
+    """
+    remaining = context.time_remaining()
+    if remaining is None or remaining > threading.TIMEOUT_MAX:
+        return None
+    return remaining
 
 
 # ---------------------------------------------------------------------------
 # gRPC Service
 # ---------------------------------------------------------------------------
+# Blocking analyzer calls run here so they never stall the event loop
+MODEL_THREADS = int(os.getenv("MODEL_THREADS", "1"))
+_MODEL_EXECUTOR = ThreadPoolExecutor(max_workers=MODEL_THREADS, thread_name_prefix="model")
+
+
 class SentimentService(pb_grpc.SentimentServiceServicer):
-    """Implements SentimentService RPCs using SentimentAnalyzerFactory."""
+    """Implements SentimentService RPCs (asyncio) using SentimentAnalyzerFactory."""
 
-    def Analyze(self, request: pb.AnalyzeRequest, context: grpc.ServicerContext) -> pb.AnalyzeResponse:
+    async def Analyze(self, request: pb.AnalyzeRequest, context: grpc.aio.ServicerContext) -> pb.AnalyzeResponse:
         """
         Analyze a single text.
 
         - language: analyzer key, e.g., "hun", "dan", "eng".
-        - On error, returns dominant_label="error" and sets gRPC status to INTERNAL.
+        - Transformer analyzers coalesce concurrent calls into micro-batches;
+          lexicon analyzers (VADER) are cheap enough to run inline.
+        - On error, returns sentiment_key="error" and sets gRPC status to INTERNAL.
         """
         try:
             lang = request.language or "hun"
             analyzer = SentimentAnalyzerFactory.get_analyzer(lang)
-            raw = analyzer.analyze_text(request.text)
+            if isinstance(analyzer, SentimentAnalyzerSingleton):
+                raw = await asyncio.wait_for(
+                    get_batcher(lang, _MODEL_EXECUTOR).submit(request.text),
+                    timeout=_timeout(context),
+                )
+            else:
+                raw = analyzer.analyze_text(request.text)
             return map_result_to_response(request.text, raw)
+        except TimeoutError:
+            log.warning("Analyze timed out waiting for batch (language=%r)", request.language)
+            context.set_code(grpc.StatusCode.DEADLINE_EXCEEDED)
+            return pb.AnalyzeResponse(title=request.text, sentiment_key="error")
         except Exception as e:
             log.exception("Analyze failed (language=%r)", getattr(request, "language", None))
             context.set_details(f"Analyze error: {e}")
             context.set_code(grpc.StatusCode.INTERNAL)
-            return pb.AnalyzeResponse(text=request.text, dominant_label="error")
+            return pb.AnalyzeResponse(title=request.text, sentiment_key="error")
 
 
-    def BatchAnalyze(self, request: pb.BatchAnalyzeRequest, context) -> pb.BatchAnalyzeResponse:
-        """
-        Analyze multiple texts, grouped by language. Uses analyzer.analyze_batch if available,
-        falling back to per-text Analyze otherwise.
+    async def BatchAnalyze(self, request: pb.BatchAnalyzeRequest, context) -> pb.BatchAnalyzeResponse:
         """
-        results = []
+        Analyze multiple texts, grouped by language.
 
+        Language groups run concurrently. Transformer analyzers share the per-language batcher
+        with Analyze, which caps every forward pass at MAX_BATCH texts however large the group.
+        Other analyzers run inline, using analyze_batch if available and per-text analyze_text
+        otherwise.
+        """
         # Group inputs by language
         by_lang: dict[str, list[str]] = {}
         for item in request.items:
             lang = item.language or "hun"
             by_lang.setdefault(lang, []).append(item.text)
 
-        for lang, texts in by_lang.items():
-            analyzer = SentimentAnalyzerFactory.get_analyzer(lang)
-            try:
-                if hasattr(analyzer, "analyze_batch") and callable(analyzer.analyze_batch):
-                    # One forward pass for all texts
-                    batch_out = analyzer.analyze_batch(texts)
-                    for text, sentiments in zip(texts, batch_out):
-                        results.append(map_result_to_response(text, sentiments))
-                else:
-                    # Fallback: process each text separately
-                    for text in texts:
-                        raw = analyzer.analyze_text(text)
-                        results.append(map_result_to_response(text, raw))
-            except Exception as e:
-                log.exception("BatchAnalyze failed (language=%r)", lang)
-                for text in texts:
-                    results.append(
-                        pb.AnalyzeResponse(
-                            title=text,
-                            sentiment_key="error",
-                            sentiment_value=0.0,
-                            sentiments={}
-                        )
-                    )
-
-        return pb.BatchAnalyzeResponse(results=results)
+        groups = await asyncio.gather(*(self._analyze_group(lang, texts) for lang, texts in by_lang.items()))
+        return pb.BatchAnalyzeResponse(results=[response for group in groups for response in group])
+
+    async def _analyze_group(self, lang: str, texts: list[str]) -> list[pb.AnalyzeResponse]:
+        """Analyze the texts of one language; on error every text gets an error response."""
+        analyzer = SentimentAnalyzerFactory.get_analyzer(lang)
+        try:
+            if isinstance(analyzer, SentimentAnalyzerSingleton):
+                # Coalesce with concurrent Analyze calls for the same language
+                batcher = get_batcher(lang, _MODEL_EXECUTOR)
+                batch_out = await asyncio.gather(*(batcher.submit(text) for text in texts))
+            elif hasattr(analyzer, "analyze_batch") and callable(analyzer.analyze_batch):
+                batch_out = analyzer.analyze_batch(texts)
+            else:
+                # Fallback: process each text separately
+                batch_out = [analyzer.analyze_text(text) for text in texts]
+            return [map_result_to_response(text, sentiments) for text, sentiments in zip(texts, batch_out)]
+        except Exception as e:
+            log.exception("BatchAnalyze failed (language=%r)", lang)
+            return [
+                pb.AnalyzeResponse(
+                    title=text,
+                    sentiment_key="error",
+                    sentiment_value=0.0,
+                    sentiments={}
+                )
+                for text in texts
+            ]
 
 # ---------------------------------------------------------------------------
 # Server bootstrap
 # ---------------------------------------------------------------------------
-def serve(host: str | None = None, port: int | None = None) -> None:
+async def serve(host: str | None = None, port: int | None = None) -> None:
     """
-    Start the gRPC server.
+    Start the asyncio gRPC server and block until it terminates.
 
     Args:
         host: Host/IP to bind (default from $GRPC_HOST or "127.0.0.1").
@@ -180,25 +223,56 @@ def serve(host: str | None = None, port: int | None = None) -> None:
     """
     host = host or os.getenv("GRPC_HOST", "127.0.0.1")
     port = port or int(os.getenv("GRPC_PORT", "50051"))
-    max_workers = int(os.getenv("MAX_WORKERS", "4"))
 
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    # Each forward pass may use every core; concurrency comes from batching instead
+    torch.set_num_threads(os.cpu_count() or 1)
+
+    # upb/cpp build messages natively; the pure-Python backend is several times slower
+    if api_implementation.Type() == "python":
+        log.warning("protobuf is using the pure-Python backend; install the upb/cpp wheel for speed")
+
+    # Build every analyzer before accepting traffic. Model export/load/warm-up takes seconds
+    # (minutes on a cold ONNX cache) and must not run on the event loop; the default executor
+    # lets the per-class locks load languages in parallel.
+    # Startup is fail-fast: if any language fails to load, the server does not start, since
+    # a later request would otherwise retry the load on the event loop.
+    loop = asyncio.get_running_loop()
+    languages = SentimentAnalyzerFactory.languages()
+    log.info("Loading analyzers: %s", ", ".join(languages))
+    loaded = await asyncio.gather(
+        *(loop.run_in_executor(None, SentimentAnalyzerFactory.get_analyzer, lang) for lang in languages),
+        return_exceptions=True,
+    )
+    failed = []
+    for lang, result in zip(languages, loaded):
+        if isinstance(result, BaseException):
+            log.error("Failed to load analyzer %r", lang, exc_info=result)
+            failed.append(lang)
+    if failed:
+        raise RuntimeError(f"Failed to load analyzers: {', '.join(failed)}")
+
+    server = grpc.aio.server()
     pb_grpc.add_SentimentServiceServicer_to_server(SentimentService(), server)
     server.add_insecure_port(f"{host}:{port}")
-    server.start()
+    await server.start()
 
     log.info(
-        "🚀 Sentiment gRPC server (version %s) on %s:%s | workers=%d",
-        SERVER_VERSION, host, port, max_workers
+        "🚀 Sentiment gRPC server (version %s) on %s:%s | model_threads=%d",
+        SERVER_VERSION, host, port, MODEL_THREADS
     )
 
-    try:
-        while True:
-            time.sleep(86400)
-    except KeyboardInterrupt:
+    # SIGINT/SIGTERM (e.g. from a container orchestrator) drain in-flight RPCs, then stop
+    shutdown_tasks = []
+
+    def _shutdown() -> None:
         log.info("Shutting down...")
-        server.stop(0)
+        shutdown_tasks.append(loop.create_task(server.stop(SHUTDOWN_GRACE)))
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, _shutdown)
+
+    await server.wait_for_termination()
 
 
 if __name__ == "__main__":
-    serve()
+    asyncio.run(serve())